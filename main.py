@@ -1,113 +1,176 @@
 import numpy as np
 import matplotlib.pyplot as plt
+from functools import lru_cache
+from numba import njit
 plt.rcParams['toolbar'] = 'none'
 
 # Define grid size
 grid_size = 3
+num_states = grid_size * grid_size
 states = [(i, j) for i in range(grid_size) for j in range(grid_size)]
 actions = ['U', 'D', 'L', 'R']
+# Alphabetical action order matching the action axis of P and EFFECTS
+SORTED_ACTIONS = sorted(actions)
+terminal_states = [(0, 2)]
 discount = 0.99
 
-action_effects = {
-    'U': (-1, 0),
-    'D': (1, 0),
-    'L': (0, -1),
-    'R': (0, 1)
-}
-
-perpendiculars = {
-    'U': ['L', 'R'],
-    'D': ['L', 'R'],
-    'L': ['U', 'D'],
-    'R': ['U', 'D']
-}
-
-def in_grid(x, y):
-    return 0 <= x < grid_size and 0 <= y < grid_size
-
-def get_next_states(state, action):
-    i, j = state
-    result = []
-
-    # Intended direction
-    di, dj = action_effects[action]
-    ni, nj = i + di, j + dj
-    if in_grid(ni, nj):
-        result.append(((ni, nj), 0.8))
-    else:
-        result.append(((i, j), 0.8))
-
-    # Perpendicular directions
-    for perp in perpendiculars[action]:
-        di, dj = action_effects[perp]
-        ni, nj = i + di, j + dj
-        if in_grid(ni, nj):
-            result.append(((ni, nj), 0.1))
-        else:
-            result.append(((i, j), 0.1))
-
-    return result
-
-def value_iteration(r, threshold=1e-4):
-    V = {s: 0 for s in states}
-    terminal_states = [(0, 2)]
-    policy = {s: 'U' for s in states if s not in terminal_states}
-
-
-    # Define state-dependent rewards
-    rewards = {
-        (0, 0): r,
-        (0, 1): -1,
-        (0, 2): 10,
-        (1, 0): -1,
-        (1, 1): -1,
-        (1, 2): -1,
-        (2, 0): -1,
-        (2, 1): -1,
-        (2, 2): -1
-    }
-
-    terminal_states = [(0, 2)]
-
+# (di, dj) per action index, rows ordered alphabetically (D, L, R, U)
+# to match the action axis of P; k = 0 is the intended direction,
+# k = 1 and 2 the perpendicular slips
+EFFECTS = np.array([
+    [(1, 0), (0, -1), (0, 1)],   # D
+    [(0, -1), (-1, 0), (1, 0)],  # L
+    [(0, 1), (-1, 0), (1, 0)],   # R
+    [(-1, 0), (0, -1), (0, 1)],  # U
+], dtype=np.int8)
+
+def build_transition_tensor():
+    # P[a, s, s'] = probability of landing in s' when taking action a in s,
+    # with states flattened as s = i * grid_size + j and actions ordered
+    # alphabetically so argmax tie-breaking matches the old loop order.
+    # Clipping the moved coordinates back into the grid reproduces the
+    # stay-in-place rule for moves off the edge without any branching.
+    I, J = np.divmod(np.arange(num_states), grid_size)
+    P = np.zeros((len(actions), num_states, num_states))
+    for a in range(len(actions)):
+        for k in range(3):
+            di, dj = EFFECTS[a, k]
+            NI = np.clip(I + di, 0, grid_size - 1)
+            NJ = np.clip(J + dj, 0, grid_size - 1)
+            prob = 0.8 if k == 0 else 0.1
+            np.add.at(P[a], (np.arange(num_states), NI * grid_size + NJ), prob)
+    # Make terminal states absorbing so their values stay fixed at 0
+    for (ti, tj) in terminal_states:
+        t = ti * grid_size + tj
+        P[:, t, :] = 0
+        P[:, t, t] = 1
+    return P
+
+P = build_transition_tensor()
+
+# Rewards by flat state index (s = i * grid_size + j). Index 0 is the
+# start state and gets patched with r per run; the terminal state's
+# entry is 0 to match its absorbing row in P.
+R_BASE = np.array([-1, -1, 0, -1, -1, -1, -1, -1, -1], dtype=np.float64)
+
+@njit(cache=True)
+def vi_kernel(P, R, V0, discount, threshold):
+    # Native-code Bellman sweep; cache=True reuses the compiled kernel
+    # across the four r values (and across runs).
+    # Gauss-Seidel style: V is updated in place so later states in the
+    # same sweep see the fresh values, which cuts the sweep count
+    # roughly in half for discount close to 1 and avoids the per-sweep
+    # copy that a Jacobi update needs.
+    num_actions = P.shape[0]
+    n = P.shape[1]
+    V = V0.copy()
+    policy_idx = np.zeros(n, dtype=np.int64)
+    gain = discount / (1.0 - discount)
     while True:
-        delta = 0
-        new_V = V.copy()
-        for state in states:
-            if state in terminal_states:
-                continue  # Skip updating terminal states
-
-            max_val = float('-inf')
-            best_action = None
-            for action in sorted(actions):
-                total = 0
-                for (next_state, prob) in get_next_states(state, action):
-                    total += prob * (rewards[state] + discount * V[next_state])
-                if total > max_val:
-                    max_val = total
-                    best_action = action
-            new_V[state] = max_val
-            policy[state] = best_action
-            delta = max(delta, abs(V[state] - new_V[state]))
-        V = new_V
-        if delta < threshold:
+        V_prev = V.copy()
+        for s in range(n):
+            best = -np.inf
+            best_a = 0
+            for a in range(num_actions):
+                q = R[s] + discount * np.dot(P[a, s], V)
+                if q > best:
+                    best = q
+                    best_a = a
+            V[s] = best
+            policy_idx[s] = best_a
+        # McQueen span bounds: the fixed point lies within
+        # gain * [lo, hi] of V, so stop once that interval is narrower
+        # than the threshold and jump to its midpoint. Much tighter
+        # than waiting for the raw update to fall below the threshold
+        # when discount is close to 1.
+        diff = V - V_prev
+        lo = diff.min()
+        hi = diff.max()
+        if gain * (hi - lo) < threshold:
+            V += gain * 0.5 * (hi + lo)
             break
-
+    return V, policy_idx
+
+@lru_cache(maxsize=None)
+def value_iteration(r, threshold=1e-4, V_init=None):
+    # Memoized on the arguments: repeated calls (parameter sweeps,
+    # notebook re-runs) return the cached solve. V_init warm-starts
+    # the sweep, e.g. with the converged V of a nearby r; pass it as a
+    # tuple so it stays hashable for the cache
+    R = R_BASE.copy()
+    R[0] = r
+
+    V0 = np.zeros(num_states) if V_init is None else np.asarray(V_init, dtype=np.float64)
+    V, policy_idx = vi_kernel(P, R, V0, discount, threshold)
+
+    # The kernel's span correction shifts every entry; terminal values
+    # are pinned at 0
+    for (ti, tj) in terminal_states:
+        V[ti * grid_size + tj] = 0
+
+    # Policy as a flat tuple by state id; terminal states get ''.
+    # Freeze V too, since the cache hands the same objects to every caller
+    policy = tuple('' if states[s] in terminal_states else SORTED_ACTIONS[policy_idx[s]]
+                   for s in range(num_states))
+    V.flags.writeable = False
     return V, policy
 
+@njit(cache=True)
+def vi_batch_kernel(P, R, discount, threshold):
+    # Solve the batch sequentially inside one compiled call, warm-
+    # starting each MDP from the previous one's converged values.
+    # Adjacent reward settings differ only in the start state, so the
+    # previous V is a much better initial guess than zeros and cuts
+    # the sweep count well below what the interleaved schedule saved.
+    B = R.shape[0]
+    n = R.shape[1]
+    V = np.zeros((B, n))
+    policy_idx = np.zeros((B, n), dtype=np.int64)
+    V0 = np.zeros(n)
+    for b in range(B):
+        Vb, pb = vi_kernel(P, R[b], V0, discount, threshold)
+        V[b] = Vb
+        policy_idx[b] = pb
+        V0 = Vb
+    return V, policy_idx
+
+def value_iteration_batch(rs, threshold=1e-4):
+    # Solve several reward settings in one kernel call; the transition
+    # tensor is shared since only the start state's reward varies
+    R = np.empty((len(rs), num_states))
+    for b, r in enumerate(rs):
+        R[b] = R_BASE
+        R[b, 0] = r
+    V, policy_idx = vi_batch_kernel(P, R, discount, threshold)
+
+    # The kernel's span correction shifts every entry; terminal values
+    # are pinned at 0
+    for (ti, tj) in terminal_states:
+        V[:, ti * grid_size + tj] = 0
+
+    results = []
+    for b in range(len(rs)):
+        policy = ['' if states[s] in terminal_states else SORTED_ACTIONS[policy_idx[b, s]]
+                  for s in range(num_states)]
+        results.append((V[b], policy))
+    return results
+
 def print_policy(policy):
-    grid = [['' for _ in range(grid_size)] for _ in range(grid_size)]
-    for (i, j) in states:
-        grid[i][j] = policy.get((i, j), ' ')
-    for row in grid:
-        print(' '.join(row))
+    for i in range(grid_size):
+        print(' '.join(policy[i * grid_size + j] or ' ' for j in range(grid_size)))
 
 def print_values(V):
     for i in range(grid_size):
-        row = [f"{V[(i, j)]:6.2f}" for j in range(grid_size)]
+        row = [f"{V[i * grid_size + j]:6.2f}" for j in range(grid_size)]
         print(' '.join(row))
 
-def plot_policy_and_values(V, policy, terminal_states, title=None):
-    fig, ax = plt.subplots()
+def plot_policy_and_values(V, policy, terminal_states, title=None, ax=None):
+    # Reuse the caller's axes when given so a parameter sweep draws on
+    # one shared figure instead of leaving a window open per run
+    standalone = ax is None
+    if standalone:
+        fig, ax = plt.subplots()
+    ax.clear()
     ax.set_xlim(-0.5, grid_size - 0.5)
     ax.set_ylim(-0.5, grid_size - 0.5)
     ax.set_xticks(np.arange(-0.5, grid_size, 1))
@@ -115,24 +178,30 @@ def plot_policy_and_values(V, policy, terminal_states, title=None):
     ax.set_xticklabels([])
     ax.set_yticklabels([])
     ax.grid(True, which='both', color='black', linewidth=1)
+    # Collect all policy arrows into one quiver collection instead of
+    # creating a separate arrow artist per cell
+    offsets = {'U': (0, -0.3), 'D': (0, 0.3), 'L': (-0.3, 0), 'R': (0.3, 0)}
+    xs, ys, us, vs = [], [], [], []
     for (i, j) in states:
         if (i, j) in terminal_states:
             ax.text(j, i, 'G', ha='center', va='center', color='green', fontsize=18, fontweight='bold')
         else:
-            a = policy.get((i, j), None)
+            a = policy[i * grid_size + j]
             if a:
-                dx, dy = 0, 0
-                if a == 'U': dx, dy = 0, -0.3
-                if a == 'D': dx, dy = 0, 0.3
-                if a == 'L': dx, dy = -0.3, 0
-                if a == 'R': dx, dy = 0.3, 0
-                ax.arrow(j, i, dx, dy, head_width=0.15, head_length=0.15, fc='k', ec='k', length_includes_head=True)
-        ax.text(j, i+0.25, f"{V.get((i, j), 0):.1f}", ha='center', va='center', color='black', fontsize=9)
+                dx, dy = offsets[a]
+                xs.append(j)
+                ys.append(i)
+                us.append(dx)
+                vs.append(dy)
+        ax.text(j, i+0.25, f"{V[i * grid_size + j]:.1f}", ha='center', va='center', color='black', fontsize=9)
+    if xs:
+        ax.quiver(xs, ys, us, vs, angles='xy', scale_units='xy', scale=1, color='k')
     if title:
         ax.set_title(title)
     ax.invert_yaxis()
     plt.tight_layout()
-    plt.show()
+    if standalone:
+        plt.show()
 
 def explain_policy(r):
     if r >= 10:
@@ -146,12 +215,16 @@ def explain_policy(r):
 
 # Example run
 if __name__ == '__main__':
-    for r in [100, 3, 0, -3]:
+    rs = [100, 3, 0, -3]
+    fig, ax = plt.subplots()
+    for r, (V, policy) in zip(rs, value_iteration_batch(rs)):
         print(f"\n--- Results for r = {r} ---")
-        V, policy = value_iteration(r)
         print("Value Function:")
         print_values(V)
         print("\nPolicy:")
         print_policy(policy)
-        plot_policy_and_values(V, policy, terminal_states=[(0,2)], title=f"Policy and Value Function for r = {r}")
-        explain_policy(r)
\ No newline at end of file
+        plot_policy_and_values(V, policy, terminal_states=[(0,2)], title=f"Policy and Value Function for r = {r}", ax=ax)
+        plt.show(block=False)
+        plt.pause(2)
+        explain_policy(r)
+    plt.close(fig)
\ No newline at end of file
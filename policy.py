@@ -1,131 +1,110 @@
 import numpy as np
 import random
 import matplotlib.pyplot as plt
+from functools import lru_cache
 plt.rcParams['toolbar'] = 'none'
 
 # Gridworld setup
 grid_size = 3
+num_states = grid_size * grid_size
 states = [(i, j) for i in range(grid_size) for j in range(grid_size)]
 actions = ['U', 'D', 'L', 'R']
+# Alphabetical action order matching the action axis of P and EFFECTS
+SORTED_ACTIONS = sorted(actions)
+terminal_states = [(0, 2)]
 discount = 0.99
 
-action_effects = {
-    'U': (-1, 0),
-    'D': (1, 0),
-    'L': (0, -1),
-    'R': (0, 1)
-}
-
-perpendiculars = {
-    'U': ['L', 'R'],
-    'D': ['L', 'R'],
-    'L': ['U', 'D'],
-    'R': ['U', 'D']
-}
-
-def in_grid(x, y):
-    return 0 <= x < grid_size and 0 <= y < grid_size
-
-def get_next_states(state, action):
-    i, j = state
-    result = []
-
-    # Intended direction
-    di, dj = action_effects[action]
-    ni, nj = i + di, j + dj
-    if in_grid(ni, nj):
-        result.append(((ni, nj), 0.8))
-    else:
-        result.append(((i, j), 0.8))
-
-    # Perpendicular directions
-    for perp in perpendiculars[action]:
-        di, dj = action_effects[perp]
-        ni, nj = i + di, j + dj
-        if in_grid(ni, nj):
-            result.append(((ni, nj), 0.1))
-        else:
-            result.append(((i, j), 0.1))
-
-    return result
-
-def policy_evaluation(policy, rewards, terminal_states, theta=1e-4):
-    V = {s: 0 for s in states}
-    while True:
-        delta = 0
-        new_V = V.copy()
-        for state in states:
-            if state in terminal_states:
-                continue
-            a = policy[state]
-            value = 0
-            for next_state, prob in get_next_states(state, a):
-                value += prob * (rewards[state] + discount * V[next_state])
-            new_V[state] = value
-            delta = max(delta, abs(V[state] - new_V[state]))
-        V = new_V
-        if delta < theta:
-            break
-    return V
-
-def policy_improvement(V, rewards, terminal_states):
-    policy = {}
-    for state in states:
-        if state in terminal_states:
-            continue
-        best_action = None
-        best_value = float('-inf')
-        for action in sorted(actions):
-            value = 0
-            for next_state, prob in get_next_states(state, action):
-                value += prob * (rewards[state] + discount * V[next_state])
-            if value > best_value:
-                best_value = value
-                best_action = action
-        policy[state] = best_action
-    return policy
-
+# (di, dj) per action index, rows ordered alphabetically (D, L, R, U)
+# to match the action axis of P; k = 0 is the intended direction,
+# k = 1 and 2 the perpendicular slips
+EFFECTS = np.array([
+    [(1, 0), (0, -1), (0, 1)],   # D
+    [(0, -1), (-1, 0), (1, 0)],  # L
+    [(0, 1), (-1, 0), (1, 0)],   # R
+    [(-1, 0), (0, -1), (0, 1)],  # U
+], dtype=np.int8)
+
+def build_transition_tensor():
+    # P[a, s, s'] = probability of landing in s' when taking action a in s,
+    # with states flattened as s = i * grid_size + j and actions ordered
+    # alphabetically so argmax tie-breaking matches the old loop order.
+    # Clipping the moved coordinates back into the grid reproduces the
+    # stay-in-place rule for moves off the edge without any branching.
+    I, J = np.divmod(np.arange(num_states), grid_size)
+    P = np.zeros((len(actions), num_states, num_states))
+    for a in range(len(actions)):
+        for k in range(3):
+            di, dj = EFFECTS[a, k]
+            NI = np.clip(I + di, 0, grid_size - 1)
+            NJ = np.clip(J + dj, 0, grid_size - 1)
+            prob = 0.8 if k == 0 else 0.1
+            np.add.at(P[a], (np.arange(num_states), NI * grid_size + NJ), prob)
+    # Make terminal states absorbing so their values stay fixed at 0
+    for (ti, tj) in terminal_states:
+        t = ti * grid_size + tj
+        P[:, t, :] = 0
+        P[:, t, t] = 1
+    return P
+
+P = build_transition_tensor()
+
+# Rewards by flat state index (s = i * grid_size + j). Index 0 is the
+# start state and gets patched with r per run; the terminal state's
+# entry is 0 to match its absorbing row in P.
+R_BASE = np.array([-1, -1, 0, -1, -1, -1, -1, -1, -1], dtype=np.float64)
+
+def policy_evaluation(policy, rewards):
+    # Rows of P selected by the policy's action index in each state;
+    # terminal rows are absorbing under every action, so no special case
+    P_pi = np.take_along_axis(P, policy[None, :, None].astype(np.int64), axis=0)[0]
+    # For a fixed policy, V = R + discount * P_pi @ V is a linear system,
+    # so solve (I - discount * P_pi) V = R exactly instead of sweeping
+    return np.linalg.solve(np.eye(num_states) - discount * P_pi, rewards)
+
+def policy_improvement(V, rewards):
+    Q = rewards[:, None] + discount * np.einsum('ask,k->sa', P, V)
+    return Q.argmax(axis=1).astype(np.int8)
+
+@lru_cache(maxsize=None)
 def policy_iteration(r):
-    # Initial random policy
-    policy = {s: random.choice(actions) for s in states}
-
-    rewards = {
-        (0, 0): r,
-        (0, 1): -1,
-        (0, 2): 10,
-        (1, 0): -1,
-        (1, 1): -1,
-        (1, 2): -1,
-        (2, 0): -1,
-        (2, 1): -1,
-        (2, 2): -1
-    }
-
-    terminal_states = [(0, 2)]
+    # Memoized on r: repeated calls (parameter sweeps, notebook
+    # re-runs) return the cached solve.
+    # Initial random policy as action indices into SORTED_ACTIONS
+    policy = np.array([random.randrange(len(actions)) for _ in states], dtype=np.int8)
+
+    rewards = R_BASE.copy()
+    rewards[0] = r
 
     is_policy_stable = False
     while not is_policy_stable:
-        V = policy_evaluation(policy, rewards, terminal_states)
-        new_policy = policy_improvement(V, rewards, terminal_states)
-        is_policy_stable = (policy == new_policy)
+        V = policy_evaluation(policy, rewards)
+        new_policy = policy_improvement(V, rewards)
+        # One vectorized comparison instead of hashing two dicts
+        is_policy_stable = np.array_equal(policy, new_policy)
         policy = new_policy
 
+    # Freeze the cached results so callers can't mutate shared state
+    V.flags.writeable = False
+    policy.flags.writeable = False
     return V, policy
 
 def print_policy(policy):
-    grid = [['' for _ in range(grid_size)] for _ in range(grid_size)]
-    for (i, j) in states:
-        grid[i][j] = policy.get((i, j), ' ')
-    for row in grid:
-        print(' '.join(row))
+    for i in range(grid_size):
+        print(' '.join(' ' if (i, j) in terminal_states else SORTED_ACTIONS[policy[i * grid_size + j]]
+                       for j in range(grid_size)))
 
 def print_values(V):
     for i in range(grid_size):
-        row = [f"{V[(i, j)]:6.2f}" for j in range(grid_size)]
+        row = [f"{V[i * grid_size + j]:6.2f}" for j in range(grid_size)]
         print(' '.join(row))
 
-def plot_policy_and_values(V, policy, terminal_states, title=None):
-    fig, ax = plt.subplots()
+def plot_policy_and_values(V, policy, terminal_states, title=None, ax=None):
+    # Reuse the caller's axes when given so a parameter sweep draws on
+    # one shared figure instead of leaving a window open per run
+    standalone = ax is None
+    if standalone:
+        fig, ax = plt.subplots()
+    ax.clear()
     ax.set_xlim(-0.5, grid_size - 0.5)
     ax.set_ylim(-0.5, grid_size - 0.5)
     ax.set_xticks(np.arange(-0.5, grid_size, 1))
@@ -133,24 +112,28 @@ def plot_policy_and_values(V, policy, terminal_states, title=None):
     ax.set_xticklabels([])
     ax.set_yticklabels([])
     ax.grid(True, which='both', color='black', linewidth=1)
+    # Collect all policy arrows into one quiver collection instead of
+    # creating a separate arrow artist per cell
+    offsets = {'U': (0, -0.3), 'D': (0, 0.3), 'L': (-0.3, 0), 'R': (0.3, 0)}
+    xs, ys, us, vs = [], [], [], []
     for (i, j) in states:
         if (i, j) in terminal_states:
             ax.text(j, i, 'G', ha='center', va='center', color='green', fontsize=18, fontweight='bold')
         else:
-            a = policy.get((i, j), None)
-            if a:
-                dx, dy = 0, 0
-                if a == 'U': dx, dy = 0, -0.3
-                if a == 'D': dx, dy = 0, 0.3
-                if a == 'L': dx, dy = -0.3, 0
-                if a == 'R': dx, dy = 0.3, 0
-                ax.arrow(j, i, dx, dy, head_width=0.15, head_length=0.15, fc='k', ec='k', length_includes_head=True)
-        ax.text(j, i+0.25, f"{V.get((i, j), 0):.1f}", ha='center', va='center', color='black', fontsize=9)
+            dx, dy = offsets[SORTED_ACTIONS[policy[i * grid_size + j]]]
+            xs.append(j)
+            ys.append(i)
+            us.append(dx)
+            vs.append(dy)
+        ax.text(j, i+0.25, f"{V[i * grid_size + j]:.1f}", ha='center', va='center', color='black', fontsize=9)
+    if xs:
+        ax.quiver(xs, ys, us, vs, angles='xy', scale_units='xy', scale=1, color='k')
     if title:
         ax.set_title(title)
     ax.invert_yaxis()
     plt.tight_layout()
-    plt.show()
+    if standalone:
+        plt.show()
 
 def explain_policy(r):
     if r >= 10:
@@ -164,6 +147,7 @@ def explain_policy(r):
 
 # Run policy iteration for each value of r
 if __name__ == '__main__':
+    fig, ax = plt.subplots()
     for r in [100, 3, 0, -3]:
         print(f"\n--- Policy Iteration Results for r = {r} ---")
         V, policy = policy_iteration(r)
@@ -171,5 +155,8 @@ if __name__ == '__main__':
         print_values(V)
         print("\nPolicy:")
         print_policy(policy)
-        plot_policy_and_values(V, policy, terminal_states=[(0,2)], title=f"Policy and Value Function for r = {r}")
+        plot_policy_and_values(V, policy, terminal_states=[(0,2)], title=f"Policy and Value Function for r = {r}", ax=ax)
+        plt.show(block=False)
+        plt.pause(2)
         explain_policy(r)
+    plt.close(fig)